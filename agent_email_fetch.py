@@ -1,27 +1,255 @@
-import email
+import atexit
+import hashlib
 import imaplib
+import math
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from email.header import decode_header
+from email import policy
+from email.parser import BytesParser
 
 from langchain.tools import tool
 
+from email_clean import strip_html
 
-def decode(value):
-    if isinstance(value, bytes):
-        value = value.decode(errors="ignore")
-    parts = decode_header(value)
-    decoded = ""
-    for item, enc in parts:
-        if isinstance(item, bytes):
-            decoded += item.decode(enc or "utf-8", errors="ignore")
+# Limits on each FETCH command: a number of messages, and a total size of
+# those messages (by RFC822.SIZE) that keeps responses below Gmail's cap of
+# roughly 20MB. A single message larger than the budget is fetched on its own.
+FETCH_BATCH_SIZE = 100
+FETCH_BATCH_BYTES = 16 * 1024 * 1024
+
+# Maximum number of IMAP connections used to fetch batches concurrently.
+# Gmail allows up to 15 simultaneous connections per account.
+FETCH_CONCURRENCY = 4
+
+# Logged-in IMAP connections kept open between fetch_emails calls, keyed by a
+# hash of the credentials. A connection is used by one caller at a time and
+# returned to the pool once that caller is done with it.
+_IMAP_POOL = {}
+_IMAP_POOL_LOCK = threading.Lock()
+
+# FETCH data items: only the headers parse_message reads plus the MIME headers
+# needed to split the body into parts, then the body itself. BODY.PEEK avoids
+# downloading unrelated headers and leaves the \Seen flag untouched.
+FETCH_ITEMS = (
+    "(BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE MIME-VERSION CONTENT-TYPE "
+    "CONTENT-TRANSFER-ENCODING)] BODY.PEEK[TEXT])"
+)
+
+
+_RE_FETCH_UID = re.compile(rb"UID (\d+)")
+_RE_FETCH_SIZE = re.compile(rb"RFC822\.SIZE (\d+)")
+
+# Shared parser; policy.default handles header decoding and body selection
+_PARSER = BytesParser(policy=policy.default)
+
+
+def parse_message(raw):
+    """
+    Parse a raw RFC822 message into an email dictionary.
+
+    Args:
+        raw: Raw message bytes (headers followed by the body)
+
+    Returns:
+        Dictionary with sender, subject, date, body and is_html keys
+    """
+    msg = _PARSER.parsebytes(raw)
+
+    # policy.default decodes RFC 2047 encoded headers on access
+    sender = str(msg.get("From", ""))
+    subject = str(msg.get("Subject", ""))
+    date = str(msg.get("Date", ""))
+
+    body = ""
+    html_body = ""
+
+    # Prefer the plain text body, falling back to HTML if no plain text found
+    part = msg.get_body(preferencelist=("plain", "html"))
+    if part is not None:
+        try:
+            content = part.get_content()
+        except (LookupError, ValueError):
+            # Charsets unknown to Python raise LookupError; decode the payload
+            # as UTF-8 instead, dropping undecodable bytes
+            payload = part.get_payload(decode=True) or b""
+            content = payload.decode(errors="ignore")
+        if part.get_content_subtype() == "html":
+            html_body = content
         else:
-            decoded += item
-    return decoded
+            body = content
+
+    # If we only got HTML, strip HTML tags and CSS, then clean up whitespace
+    if not body and html_body:
+        body = " ".join(strip_html(html_body).split())
 
+    # Bodies are always plain text by now, so clean_email can skip HTML cleanup
+    return {
+        "sender": sender,
+        "subject": subject,
+        "date": date,
+        "body": body,
+        "is_html": False,
+    }
 
-@tool("fetch_emails")
-def fetch_emails(email_id: str, app_password: str, start_date: str, end_date: str):
+
+def _connect(email_id, app_password):
+    """Open an IMAP connection to Gmail with INBOX selected."""
+    imap = imaplib.IMAP4_SSL("imap.gmail.com")
+    imap.login(email_id, app_password)
+    imap.select("INBOX")
+    return imap
+
+
+def _disconnect(imap):
+    """Close the mailbox and log out, ignoring errors on teardown."""
+    try:
+        imap.close()
+        imap.logout()
+    except:
+        pass
+
+
+def _pool_key(email_id, app_password):
+    """Pool key for a login, so credentials are not kept as plain dict keys."""
+    return hashlib.sha256(f"{email_id}:{app_password}".encode()).hexdigest()
+
+
+@contextmanager
+def _session(email_id, app_password):
+    """
+    Check out a pooled IMAP connection for the duration of a with block.
+
+    Idle connections are checked with NOOP before reuse and replaced if the
+    server has dropped them. The connection goes back to the pool only if the
+    block succeeds; after an error it is logged out instead.
+    """
+    key = _pool_key(email_id, app_password)
+
+    while True:
+        with _IMAP_POOL_LOCK:
+            idle = _IMAP_POOL.get(key)
+            imap = idle.pop() if idle else None
+        if imap is None:
+            imap = _connect(email_id, app_password)
+            break
+        try:
+            imap.noop()
+            break
+        except (imaplib.IMAP4.error, OSError):
+            _disconnect(imap)
+
+    try:
+        yield imap
+    except BaseException:
+        _disconnect(imap)
+        raise
+
+    with _IMAP_POOL_LOCK:
+        _IMAP_POOL.setdefault(key, []).append(imap)
+
+
+@atexit.register
+def _close_pool():
+    """Log out of every pooled connection when the process exits."""
+    with _IMAP_POOL_LOCK:
+        connections = [imap for idle in _IMAP_POOL.values() for imap in idle]
+        _IMAP_POOL.clear()
+    for imap in connections:
+        _disconnect(imap)
+
+
+def _iter_raw_messages(msg_data):
+    """Join the header and text sections of a FETCH response per message."""
+    header = text = None
+
+    for item in msg_data:
+        if not isinstance(item, tuple):
+            continue
+        prefix, payload = item
+        # b'N (UID n BODY[...] {size}' opens a message, b' BODY[...] {size}'
+        # continues it
+        if prefix[:1].isdigit():
+            if header is not None:
+                yield header + (text or b"")
+            header = text = None
+        if b"HEADER.FIELDS" in prefix:
+            header = payload
+        else:
+            text = payload
+
+    if header is not None:
+        yield header + (text or b"")
+
+
+def _fetch_sizes(imap, uids):
+    """Return the RFC822.SIZE of each UID, or an empty dict if unavailable."""
+    # One FETCH over the UID range; sizes are small, so messages in the range
+    # but outside the search results cost little
+    uid_range = b"%d:%d" % (min(map(int, uids)), max(map(int, uids)))
+    status, data = imap.uid("FETCH", uid_range, "(RFC822.SIZE)")
+    if status != "OK":
+        return {}
+
+    sizes = {}
+    for line in data:
+        if not isinstance(line, bytes):
+            continue
+        uid = _RE_FETCH_UID.search(line)
+        size = _RE_FETCH_SIZE.search(line)
+        if uid and size:
+            sizes[uid.group(1)] = int(size.group(1))
+    return sizes
+
+
+def _batch_uids(uids, sizes):
+    """Split UIDs into FETCH batches capped by message count and total size."""
+    batches = []
+    batch = []
+    batch_bytes = 0
+
+    for uid in uids:
+        size = sizes.get(uid, 0)
+        if batch and (
+            len(batch) == FETCH_BATCH_SIZE or batch_bytes + size > FETCH_BATCH_BYTES
+        ):
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(uid)
+        batch_bytes += size
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _fetch_uids(imap, batches):
+    """Fetch and parse messages by UID, one FETCH per batch."""
+    email_list = []
+
+    for batch in batches:
+        status, msg_data = imap.uid("FETCH", b",".join(batch), FETCH_ITEMS)
+        if status != "OK":
+            continue
+
+        for raw in _iter_raw_messages(msg_data):
+            email_list.append(parse_message(raw))
+
+    return email_list
+
+
+def _fetch_shard(email_id, app_password, batches):
+    """Fetch a shard of UID batches over its own pooled IMAP connection."""
+    with _session(email_id, app_password) as imap:
+        return _fetch_uids(imap, batches)
+
+
+def _fetch_emails_impl(
+    email_id: str, app_password: str, start_date: str, end_date: str
+):
     """
     Fetch all emails between start_date and end_date (inclusive).
 
@@ -37,123 +265,42 @@ def fetch_emails(email_id: str, app_password: str, start_date: str, end_date: st
     Raises:
         Exception: If authentication fails or connection issues occur
     """
-    imap = None
     try:
-        # Connect and login
-        imap = imaplib.IMAP4_SSL("imap.gmail.com")
-        imap.login(email_id, app_password)
-        imap.select("INBOX")
+        # Reuse a logged-in connection from an earlier call when possible
+        with _session(email_id, app_password) as imap:
+            # Format for IMAP (DD-Mon-YYYY)
+            # Add 1 day to end_date to make it inclusive (BEFORE is exclusive)
+            end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+            end_dt_plus_one = (end_dt + timedelta(days=1)).strftime("%d-%b-%Y")
+            sd = datetime.strptime(start_date, "%Y-%m-%d").strftime("%d-%b-%Y")
 
-        # Format for IMAP (DD-Mon-YYYY)
-        # Add 1 day to end_date to make it inclusive (BEFORE is exclusive)
-        end_dt = datetime.strptime(end_date, "%Y-%m-%d")
-        end_dt_plus_one = (end_dt + timedelta(days=1)).strftime("%d-%b-%Y")
-        sd = datetime.strptime(start_date, "%Y-%m-%d").strftime("%d-%b-%Y")
+            query = f'(SINCE "{sd}" BEFORE "{end_dt_plus_one}")'
+            status, data = imap.uid("SEARCH", None, query)
 
-        query = f'(SINCE "{sd}" BEFORE "{end_dt_plus_one}")'
-        status, data = imap.search(None, query)
+            if status != "OK":
+                return {"emails": []}
 
-        if status != "OK":
-            return {"emails": []}
+            uids = data[0].split()
+            if not uids:
+                return {"emails": []}
 
-        email_list = []
+            # Cut batches by message count and size, then split them into
+            # contiguous shards, one per connection
+            batches = _batch_uids(uids, _fetch_sizes(imap, uids))
+            shard_size = math.ceil(len(batches) / FETCH_CONCURRENCY)
+            shards = [
+                batches[i : i + shard_size] for i in range(0, len(batches), shard_size)
+            ]
 
-        for num in data[0].split():
-            status, msg_data = imap.fetch(num, "(RFC822)")
-            if status != "OK":
-                continue
-
-            msg = email.message_from_bytes(msg_data[0][1])
-
-            sender = decode(msg.get("From"))
-            subject = decode(msg.get("Subject"))
-            date = msg.get("Date")
-
-            body = ""
-            html_body = ""
-
-            if msg.is_multipart():
-                for part in msg.walk():
-                    content_type = part.get_content_type()
-                    if content_type == "text/plain":
-                        try:
-                            body = part.get_payload(decode=True).decode(errors="ignore")
-                            break  # Prefer plain text
-                        except:
-                            pass
-                    elif content_type == "text/html" and not body:
-                        # Fallback to HTML if no plain text found
-                        try:
-                            html_body = part.get_payload(decode=True).decode(
-                                errors="ignore"
-                            )
-                        except:
-                            pass
-            else:
-                content_type = msg.get_content_type()
-                try:
-                    payload = msg.get_payload(decode=True)
-                    if payload:
-                        decoded = payload.decode(errors="ignore")
-                        if content_type == "text/html":
-                            html_body = decoded
-                        else:
-                            body = decoded
-                except:
-                    body = ""
-
-            # If we only got HTML, strip HTML tags and CSS
-            if not body and html_body:
-                # Remove style and script tags with their contents
-                html_body = re.sub(
-                    r"<style[^>]*>.*?</style>",
-                    "",
-                    html_body,
-                    flags=re.DOTALL | re.IGNORECASE,
-                )
-                html_body = re.sub(
-                    r"<script[^>]*>.*?</script>",
-                    "",
-                    html_body,
-                    flags=re.DOTALL | re.IGNORECASE,
-                )
-                # Remove all remaining HTML tags
-                body = re.sub(r"<[^>]+>", "", html_body)
-                # Decode HTML entities
-                body = (
-                    body.replace("&nbsp;", " ")
-                    .replace("&amp;", "&")
-                    .replace("&lt;", "<")
-                    .replace("&gt;", ">")
-                )
-                body = (
-                    body.replace("&quot;", '"')
-                    .replace("&#39;", "'")
-                    .replace("&apos;", "'")
-                )
-                body = (
-                    body.replace("&mdash;", "—")
-                    .replace("&ndash;", "–")
-                    .replace("&hellip;", "...")
-                )
-                # Remove HTML/CSS comments
-                html_body = re.sub(r"<!--.*?-->", "", html_body, flags=re.DOTALL)
-                html_body = re.sub(r"/\*.*?\*/", "", html_body, flags=re.DOTALL)
-                # Remove CSS-like patterns (property: value;)
-                body = re.sub(r"\b[a-zA-Z-]+\s*:\s*[^;{}\n]+;", "", body)
-                # Remove CSS braces
-                body = re.sub(r"\{[^{}]*\}", "", body)
-                # Clean up whitespace
-                body = " ".join(body.split())
-
-            email_list.append(
-                {
-                    "sender": sender,
-                    "subject": subject,
-                    "date": date,
-                    "body": body,
-                }
+            if len(shards) <= 1:
+                return {"emails": _fetch_uids(imap, batches)}
+
+        # Fetch shards concurrently; map() keeps results in mailbox order
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            results = pool.map(
+                lambda shard: _fetch_shard(email_id, app_password, shard), shards
             )
+            email_list = [e for shard_emails in results for e in shard_emails]
 
         return {"emails": email_list}
 
@@ -161,14 +308,11 @@ def fetch_emails(email_id: str, app_password: str, start_date: str, end_date: st
         raise Exception(f"IMAP authentication failed: {e}")
     except Exception as e:
         raise Exception(f"Failed to fetch emails: {e}")
-    finally:
-        # Ensure proper cleanup
-        if imap:
-            try:
-                imap.close()
-                imap.logout()
-            except:
-                pass
+
+
+# LLM-facing tool. Trusted Python callers use _fetch_emails_impl directly to
+# skip the tool's argument validation.
+fetch_emails = tool("fetch_emails")(_fetch_emails_impl)
 
 
 from langchain.agents import create_agent
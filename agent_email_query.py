@@ -1,14 +1,55 @@
+import functools
 import os
 
-from langchain_community.vectorstores import Chroma
+from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.chat_history import InMemoryChatMessageHistory
 from langchain_ollama import ChatOllama, OllamaEmbeddings
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 
+# Import the store loaders shared with agent_email_vector
+from agent_email_vector import open_chroma_store, open_faiss_store
+
 # Import configuration
 from config import config
 
+# Maximal marginal relevance settings: candidates fetched per returned email,
+# and the relevance/diversity trade-off (1.0 = pure similarity)
+MMR_FETCH_MULTIPLIER = 4
+MMR_LAMBDA_MULT = 0.5
+
+_SYSTEM_PROMPT = """You are an intelligent email assistant. Answer the user's question based on the provided email context.
+Be concise, accurate, and helpful. If the context doesn't contain enough information to answer the question, say so.
+When counting or listing emails, be specific and accurate based on the provided context."""
+
+_SYSTEM_PROMPT_WITH_MEMORY = (
+    _SYSTEM_PROMPT
+    + "\nYou can refer to previous conversation context when answering follow-up questions."
+)
+
+_USER_PROMPT = """Context (Retrieved Emails):
+{context}
+
+Question: {question}
+
+Answer:"""
+
+# Prompt templates are built once at import and shared by every query
+_PROMPT_WITH_MEMORY = ChatPromptTemplate.from_messages(
+    [
+        ("system", _SYSTEM_PROMPT_WITH_MEMORY),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("user", _USER_PROMPT),
+    ]
+)
+
+_PROMPT_NO_MEMORY = ChatPromptTemplate.from_messages(
+    [
+        ("system", _SYSTEM_PROMPT),
+        ("user", _USER_PROMPT),
+    ]
+)
+
 
 class SimpleConversationMemory:
     """Simple conversation memory for session-based chat history."""
@@ -25,10 +66,14 @@ class SimpleConversationMemory:
             self.chat_memory.add_ai_message(outputs["output"])
 
 
+@functools.lru_cache(maxsize=1)
 def get_embeddings():
     """
     Initialize embeddings based on LLM_PROVIDER from config.
 
+    The instance is created once and reused, so later calls share its client
+    and connection pool.
+
     Returns:
         Embeddings instance (OllamaEmbeddings or GoogleGenerativeAIEmbeddings)
 
@@ -51,10 +96,13 @@ def get_embeddings():
         )
 
 
+@functools.lru_cache(maxsize=1)
 def get_llm():
     """
     Initialize LLM based on LLM_PROVIDER from config.
 
+    Cached like get_embeddings(), so every query reuses the same client.
+
     Returns:
         LLM instance (ChatOllama or ChatGoogleGenerativeAI)
 
@@ -79,20 +127,29 @@ def get_llm():
         )
 
 
+@functools.lru_cache(maxsize=2)
+def _get_chain(with_memory):
+    """Return the prompt | llm chain for the given mode, built on first use."""
+    prompt = _PROMPT_WITH_MEMORY if with_memory else _PROMPT_NO_MEMORY
+    return prompt | get_llm()
+
+
 def load_vector_store(persist_directory=None):
     """
-    Load the existing ChromaDB vector store from disk.
+    Load the existing vector store from disk.
+
+    The backend (ChromaDB or FAISS) is chosen by VECTOR_STORE_BACKEND.
 
     Args:
-        persist_directory: Directory where ChromaDB data is stored (uses config if not provided)
+        persist_directory: Directory where the vector store is saved (uses config if not provided)
 
     Returns:
-        Loaded Chroma vectorstore instance
+        Loaded Chroma or FAISS vectorstore instance
 
     Raises:
         FileNotFoundError: If vector store doesn't exist
     """
-    persist_dir = persist_directory or config.CHROMA_PERSIST_DIRECTORY
+    persist_dir = persist_directory or config.VECTOR_STORE_DIRECTORY
 
     # Check if vector store exists
     if not os.path.exists(persist_dir):
@@ -105,22 +162,34 @@ def load_vector_store(persist_directory=None):
         # Get embeddings based on provider
         embeddings = get_embeddings()
 
-        vectorstore = Chroma(
-            collection_name=config.CHROMA_COLLECTION_NAME,
-            embedding_function=embeddings,
-            persist_directory=persist_dir,
-        )
-        return vectorstore
+        if config.VECTOR_STORE_BACKEND == "faiss":
+            vectorstore = open_faiss_store(embeddings, persist_dir)
+        else:
+            vectorstore = open_chroma_store(embeddings, persist_dir)
     except Exception as e:
         raise Exception(f"Failed to load vector store: {e}")
 
+    if vectorstore is None:
+        raise FileNotFoundError(
+            f"Vector store not found at '{persist_dir}'. "
+            "Please run the workflow to fetch and index emails first."
+        )
+    return vectorstore
+
+
+def get_document_count(vectorstore):
+    """Return the number of emails stored in a Chroma or FAISS vector store."""
+    if isinstance(vectorstore, FAISS):
+        return vectorstore.index.ntotal
+    return vectorstore._collection.count()
+
 
 def query_emails(vectorstore, user_query, memory=None, k=None):
     """
     Query the email vector store and generate a natural language response.
 
     Args:
-        vectorstore: ChromaDB vector store instance
+        vectorstore: Chroma or FAISS vector store instance
         user_query: User's question about emails
         memory: Optional SimpleConversationMemory instance for conversational context
         k: Number of relevant emails to retrieve (uses config if not provided)
@@ -134,44 +203,24 @@ def query_emails(vectorstore, user_query, memory=None, k=None):
     k = k or config.DEFAULT_RETRIEVAL_COUNT
 
     try:
-        # Retrieve relevant emails using similarity search
-        relevant_docs = vectorstore.similarity_search(user_query, k=k)
+        # Retrieve relevant emails, skipping near-duplicates (e.g. repeated
+        # notifications) in favour of emails that add new information
+        relevant_docs = vectorstore.max_marginal_relevance_search(
+            user_query,
+            k=k,
+            fetch_k=k * MMR_FETCH_MULTIPLIER,
+            lambda_mult=MMR_LAMBDA_MULT,
+        )
 
         # Format retrieved emails as context
-        context = ""
-        for i, doc in enumerate(relevant_docs, 1):
-            context += f"\n--- Email {i} ---\n"
-            context += doc.page_content
-            context += "\n"
-
-        # Get LLM based on provider
-        llm = get_llm()
+        context = "".join(
+            f"\n--- Email {i} ---\n{doc.page_content}\n"
+            for i, doc in enumerate(relevant_docs, 1)
+        )
 
-        # Create prompt template with memory support
         if memory:
-            prompt = ChatPromptTemplate.from_messages(
-                [
-                    (
-                        "system",
-                        """You are an intelligent email assistant. Answer the user's question based on the provided email context.
-Be concise, accurate, and helpful. If the context doesn't contain enough information to answer the question, say so.
-When counting or listing emails, be specific and accurate based on the provided context.
-You can refer to previous conversation context when answering follow-up questions.""",
-                    ),
-                    MessagesPlaceholder(variable_name="chat_history"),
-                    (
-                        "user",
-                        """Context (Retrieved Emails):
-{context}
-
-Question: {question}
-
-Answer:""",
-                    ),
-                ]
-            )
             # Build chain with memory
-            chain = prompt | llm
+            chain = _get_chain(with_memory=True)
             # Get conversation history from memory
             chat_history = memory.chat_memory.messages
             response = chain.invoke(
@@ -185,26 +234,7 @@ Answer:""",
             memory.save_context({"input": user_query}, {"output": response.content})
         else:
             # No memory - simple prompt
-            prompt = ChatPromptTemplate.from_messages(
-                [
-                    (
-                        "system",
-                        """You are an intelligent email assistant. Answer the user's question based on the provided email context.
-Be concise, accurate, and helpful. If the context doesn't contain enough information to answer the question, say so.
-When counting or listing emails, be specific and accurate based on the provided context.""",
-                    ),
-                    (
-                        "user",
-                        """Context (Retrieved Emails):
-{context}
-
-Question: {question}
-
-Answer:""",
-                    ),
-                ]
-            )
-            chain = prompt | llm
+            chain = _get_chain(with_memory=False)
             response = chain.invoke({"context": context, "question": user_query})
 
         return response.content
@@ -1,19 +1,61 @@
+import functools
+import hashlib
+import math
+import multiprocessing
+import os
 import re
-import uuid
+from concurrent.futures import ProcessPoolExecutor
 
 from email_reply_parser import EmailReplyParser
-from langchain_community.vectorstores import Chroma
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS, Chroma
 from langchain_ollama import OllamaEmbeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
+from email_clean import strip_html
+
 # Import configuration
 from config import config
 
+# Number of emails embedded per request (the Gemini endpoint accepts up to 100)
+EMBEDDING_BATCH_SIZE = 100
+
+# Number of emails handed to each worker when cleaning in a process pool.
+# Lists no longer than this are cleaned inline, where pool start-up would cost
+# more than it saves.
+CLEAN_CHUNK_SIZE = 32
+
+# Cleaning workers start from a fresh server process instead of being forked
+# from this one, which may already run embedding or vector store client
+# threads. Platforms without forkserver spawn them instead.
+_CLEAN_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver"
+    if "forkserver" in multiprocessing.get_all_start_methods()
+    else "spawn"
+)
+
+# FAISS index sizes. Stores start on an exact float32 index and are rebuilt as
+# an 8-bit scalar-quantized index once they hold enough vectors to estimate
+# each dimension's range, then as IVF-PQ once they can train its centroids.
+# IVF-PQ settings: inverted lists the vectors are clustered into, lists
+# scanned per query, and PQ sub-vectors (of 8 bits each) per embedding.
+FAISS_SQ_MIN_TRAINING = 1000
+FAISS_NLIST = 256
+FAISS_NPROBE = 16
+FAISS_PQ_M = 16
+FAISS_IVF_MIN_TRAINING = 39 * FAISS_NLIST
+
+# Whitespace pattern used by clean_email, compiled once per process
+_RE_WS = re.compile(r'\s+')
 
+
+@functools.lru_cache(maxsize=1)
 def get_embeddings():
     """
     Initialize embeddings based on LLM_PROVIDER from config.
 
+    The instance is cached, so repeated builds reuse the same client.
+
     Returns:
         Embeddings instance (OllamaEmbeddings or GoogleGenerativeAIEmbeddings)
 
@@ -39,41 +81,17 @@ def get_embeddings():
 def clean_email(email):
     body = email["body"]
 
-    # 1. Remove style and script tags with their contents (in case any slipped through)
-    body = re.sub(r'<style[^>]*>.*?</style>', '', body, flags=re.DOTALL | re.IGNORECASE)
-    body = re.sub(r'<script[^>]*>.*?</script>', '', body, flags=re.DOTALL | re.IGNORECASE)
-    
-    # 2. Remove all remaining HTML tags
-    body = re.sub(r'<[^>]+>', '', body)
-    
-    # 3. Decode HTML entities
-    body = body.replace('&nbsp;', ' ').replace('&amp;', '&').replace('&lt;', '<')
-    body = body.replace('&gt;', '>').replace('&quot;', '"').replace('&#39;', "'")
-    body = body.replace('&apos;', "'").replace('&mdash;', '—').replace('&ndash;', '–')
-    body = body.replace('&hellip;', '...').replace('&copy;', '(c)').replace('&reg;', '(R)')
-    
-    # 4. Remove HTML/CSS comments
-    body = re.sub(r'<!--.*?-->', '', body, flags=re.DOTALL)
-    body = re.sub(r'/\*.*?\*/', '', body, flags=re.DOTALL)
+    # 1. Convert HTML bodies to plain text. Emails from fetch_emails are
+    # already plain text (is_html False); emails without the flag, such as
+    # ones loaded from older JSON dumps, are checked for markup and CSS.
+    if email.get('is_html', True):
+        body = strip_html(body)
     
-    # 5. Remove CSS-like patterns more carefully
-    # Remove CSS properties (but be careful not to remove URLs or normal text)
-    # Only remove if it looks like CSS: property:value; or property: value;
-    body = re.sub(r'\b[a-zA-Z-]+\s*:\s*[^;{}\n]+;', '', body)
-    # Remove CSS at-rules (@media, @font-face, etc.)
-    body = re.sub(r'@[a-zA-Z-]+\s+[^{]*\{[^}]*\}', '', body)
-    # Remove standalone CSS braces with content
-    body = re.sub(r'\{[^{}]*\}', '', body)
-    
-    # 6. Remove standalone numbers that might be HTML entity codes
-    body = re.sub(r'^\d+\s+', '', body)  # Remove leading numbers
-    body = re.sub(r'\s+\d+\s+', ' ', body)  # Remove standalone number words
-    
-    # 7. Remove reply chain
+    # 2. Remove reply chain
     body = EmailReplyParser.parse_reply(body)
 
-    # 8. Normalize whitespace - collapse multiple spaces/newlines
-    body = re.sub(r'\s+', ' ', body)
+    # 3. Normalize whitespace - collapse multiple spaces/newlines
+    body = _RE_WS.sub(' ', body)
     body = body.strip()
 
     combined = (
@@ -86,16 +104,192 @@ def clean_email(email):
     return combined
 
 
+def _clean_emails(emails):
+    """
+    Run clean_email over emails, returning the texts in the same order.
+
+    Emails already converted to plain text at fetch time only need reply
+    stripping, so they are cleaned inline. Emails that may hold HTML go to
+    worker processes when there are enough of them to outweigh pool start-up.
+    """
+    html_indexes = [i for i, e in enumerate(emails) if e.get("is_html", True)]
+    cleaned = {}
+
+    if len(html_indexes) > CLEAN_CHUNK_SIZE:
+        # One worker per chunk at most; the pool starts every worker up front
+        chunks = math.ceil(len(html_indexes) / CLEAN_CHUNK_SIZE)
+        workers = min(os.cpu_count() or 1, chunks)
+        with ProcessPoolExecutor(workers, mp_context=_CLEAN_MP_CONTEXT) as pool:
+            html_emails = [emails[i] for i in html_indexes]
+            texts = pool.map(clean_email, html_emails, chunksize=CLEAN_CHUNK_SIZE)
+            cleaned = dict(zip(html_indexes, texts))
+
+    return [
+        cleaned[i] if i in cleaned else clean_email(e) for i, e in enumerate(emails)
+    ]
+
+
+def _email_id(email):
+    """Return a deterministic ID derived from the email's content."""
+    key = f"{email['sender']}|{email['subject']}|{email['date']}|{email['body']}"
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def open_chroma_store(embeddings, persist_dir):
+    """Open (or create) the persistent Chroma collection."""
+    return Chroma(
+        collection_name=config.CHROMA_COLLECTION_NAME,
+        embedding_function=embeddings,
+        persist_directory=persist_dir,
+    )
+
+
+def open_faiss_store(embeddings, persist_dir):
+    """Load the FAISS store saved in persist_dir, or None if there is none yet."""
+    if not os.path.exists(os.path.join(persist_dir, "index.faiss")):
+        return None
+    # The docstore is a pickle written by build_vector_store itself
+    return FAISS.load_local(
+        persist_dir, embeddings, allow_dangerous_deserialization=True
+    )
+
+
+def _faiss_index_kind(n, d):
+    """Return the index type for a FAISS store of n vectors of dimension d."""
+    if n >= FAISS_IVF_MIN_TRAINING and d % FAISS_PQ_M == 0:
+        return "ivfpq"
+    if n >= FAISS_SQ_MIN_TRAINING:
+        return "sq8"
+    return "flat"
+
+
+def _faiss_index_type(index):
+    """Return the _faiss_index_kind name of an existing FAISS index."""
+    import faiss
+
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "sq8"
+    return "flat"
+
+
+def _new_faiss_index(data):
+    """
+    Create an empty FAISS index trained on data, a float32 array of vectors.
+
+    Small stores use exact float32 search. Larger ones store 8-bit codes, a
+    quarter of the size of float32, and the largest use IVF-PQ, which only
+    scans the FAISS_NPROBE closest of FAISS_NLIST clusters per query.
+    """
+    import faiss
+
+    n, d = data.shape
+    kind = _faiss_index_kind(n, d)
+
+    if kind == "flat":
+        return faiss.IndexFlatL2(d)
+
+    if kind == "sq8":
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit)
+        index.train(data)
+        return index
+
+    quantizer = faiss.IndexFlatL2(d)
+    index = faiss.IndexIVFPQ(quantizer, d, FAISS_NLIST, FAISS_PQ_M, 8)
+    index.train(data)
+    # nprobe is saved with the index, so loaded stores search the same way
+    index.nprobe = FAISS_NPROBE
+    # MMR search reconstructs candidate vectors by id
+    index.make_direct_map()
+    return index
+
+
+def _upgrade_faiss_index(vectorstore, vectors):
+    """
+    Rebuild the store's index if adding vectors calls for another index type.
+
+    The new index is trained on the stored vectors together with the new
+    ones, so quantizers never depend on a small first build. Stored vectors
+    are re-added in order, which keeps index_to_docstore_id valid.
+    """
+    import numpy as np
+
+    index = vectorstore.index
+    current = _faiss_index_type(index)
+    if _faiss_index_kind(index.ntotal + len(vectors), index.d) == current:
+        return
+
+    stored = index.reconstruct_n(0, index.ntotal)
+    new_index = _new_faiss_index(np.vstack([stored, vectors]))
+    new_index.add(stored)
+    vectorstore.index = new_index
+
+
+def _add_to_chroma(vectorstore, embeddings, texts, metadatas):
+    """Embed texts and add them to the Chroma collection batch by batch."""
+    # Embed in explicit batches so each provider request carries many emails
+    for i in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        batch_texts = texts[i : i + EMBEDDING_BATCH_SIZE]
+        batch_metadatas = metadatas[i : i + EMBEDDING_BATCH_SIZE]
+        vectorstore._collection.add(
+            ids=[m["id"] for m in batch_metadatas],
+            embeddings=embeddings.embed_documents(batch_texts),
+            metadatas=batch_metadatas,
+            documents=batch_texts,
+        )
+    return vectorstore
+
+
+def _add_to_faiss(vectorstore, embeddings, texts, metadatas, persist_dir):
+    """Embed texts, add them to the FAISS store (creating it) and save it."""
+    import numpy as np
+
+    if not texts:
+        return vectorstore
+
+    vectors = []
+    for i in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        vectors.extend(embeddings.embed_documents(texts[i : i + EMBEDDING_BATCH_SIZE]))
+
+    data = np.asarray(vectors, dtype=np.float32)
+
+    # Quantized indexes are trained before vectors are added to them
+    if vectorstore is None:
+        vectorstore = FAISS(
+            embedding_function=embeddings,
+            index=_new_faiss_index(data),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+        )
+    else:
+        _upgrade_faiss_index(vectorstore, data)
+
+    vectorstore.add_embeddings(
+        zip(texts, vectors),
+        metadatas=metadatas,
+        ids=[m["id"] for m in metadatas],
+    )
+    vectorstore.save_local(persist_dir)
+    return vectorstore
+
+
 def build_vector_store(email_list, persist_directory=None):
     """
-    Build a ChromaDB vector store from a list of email dictionaries.
+    Build a vector store from a list of email dictionaries.
+
+    The backend is chosen by VECTOR_STORE_BACKEND: a ChromaDB collection, or
+    a FAISS index that moves to int8 and then IVF-PQ codes as it grows.
+
+    Emails are identified by a hash of their content, so emails already in the
+    store are skipped instead of being embedded and stored again.
 
     Args:
         email_list: List of email dictionaries with keys: sender, subject, date, body
         persist_directory: Directory to persist the vector store (uses config if not provided)
 
     Returns:
-        ChromaDB vector store instance
+        Chroma or FAISS vector store instance
 
     Raises:
         ValueError: If email_list is empty or invalid
@@ -104,41 +298,54 @@ def build_vector_store(email_list, persist_directory=None):
     if not email_list:
         raise ValueError("Email list cannot be empty")
 
-    persist_dir = persist_directory or config.CHROMA_PERSIST_DIRECTORY
+    persist_dir = persist_directory or config.VECTOR_STORE_DIRECTORY
+    use_faiss = config.VECTOR_STORE_BACKEND == "faiss"
 
     try:
-        cleaned_texts = []
-        metadatas = []
-
+        # Key emails by content hash; duplicates within the list collapse
+        new_emails = {}
         for e in email_list:
             # Validate email structure
             if not all(key in e for key in ["sender", "subject", "date", "body"]):
                 raise ValueError(
                     f"Invalid email structure. Required keys: sender, subject, date, body"
                 )
+            new_emails.setdefault(_email_id(e), e)
+
+        # Get embeddings based on provider
+        embeddings = get_embeddings()
 
-            cleaned = clean_email(e)
-            cleaned_texts.append(cleaned)
+        # Skip emails already indexed by a previous run
+        if use_faiss:
+            vectorstore = open_faiss_store(embeddings, persist_dir)
+            if vectorstore is not None:
+                indexed = set(vectorstore.index_to_docstore_id.values())
+                new_emails = {k: v for k, v in new_emails.items() if k not in indexed}
+        else:
+            vectorstore = open_chroma_store(embeddings, persist_dir)
+            existing = vectorstore._collection.get(ids=list(new_emails), include=[])
+            for email_id in existing["ids"]:
+                del new_emails[email_id]
+
+        # HTML cleanup is CPU-bound, so many HTML emails run in worker processes
+        cleaned_texts = _clean_emails(list(new_emails.values()))
+        metadatas = []
+
+        for email_id, e in new_emails.items():
             metadatas.append(
                 {
                     "sender": e["sender"],
                     "subject": e["subject"],
                     "date": e["date"],
-                    "id": str(uuid.uuid4()),
+                    "id": email_id,
                 }
             )
 
-        # Get embeddings based on provider
-        embeddings = get_embeddings()
-
-        vectorstore = Chroma.from_texts(
-            texts=cleaned_texts,
-            embedding=embeddings,
-            metadatas=metadatas,
-            collection_name=config.CHROMA_COLLECTION_NAME,
-            persist_directory=persist_dir,
-        )
-        return vectorstore
+        if use_faiss:
+            return _add_to_faiss(
+                vectorstore, embeddings, cleaned_texts, metadatas, persist_dir
+            )
+        return _add_to_chroma(vectorstore, embeddings, cleaned_texts, metadatas)
 
     except Exception as e:
         raise Exception(f"Failed to build vector store: {e}")
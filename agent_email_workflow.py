@@ -2,12 +2,15 @@ import json
 import os
 from datetime import datetime
 
-# Import the fetch_emails tool from agent_email_fetch
-from agent_email_fetch import fetch_emails
+# Import the plain fetch function behind the fetch_emails tool
+from agent_email_fetch import _fetch_emails_impl
 
 # Import vector store building function from agent_email_vector
 from agent_email_vector import build_vector_store
 
+# Import document count helper shared with the CLI
+from agent_email_query import get_document_count
+
 # Import configuration
 from config import config
 
@@ -15,8 +18,8 @@ from config import config
 def run_email_workflow(start_date=None, end_date=None):
     """
     Orchestrates the email workflow:
-    1. Fetches emails using the fetch_emails tool
-    2. Builds a ChromaDB vector store from the fetched emails
+    1. Fetches emails by calling _fetch_emails_impl (behind the fetch_emails tool) directly
+    2. Builds a vector store (ChromaDB or FAISS) from the fetched emails
     3. Returns the vector store for later use
 
     Args:
@@ -24,7 +27,7 @@ def run_email_workflow(start_date=None, end_date=None):
         end_date: Optional end date (YYYY-MM-DD), uses config if not provided
 
     Returns:
-        ChromaDB vector store instance or None if no emails found
+        Chroma or FAISS vector store instance or None if no emails found
 
     Raises:
         ValueError: If configuration is invalid
@@ -47,15 +50,13 @@ def run_email_workflow(start_date=None, end_date=None):
 
         print("Step 1: Fetching emails...")
 
-        # Directly invoke the fetch_emails tool
-        # No need for agent pattern since we're just calling one tool directly
-        result = fetch_emails.invoke(
-            {
-                "email_id": config.EMAIL_ID,
-                "app_password": config.APP_PASSWORD,
-                "start_date": start,
-                "end_date": end,
-            }
+        # Call the function behind the fetch_emails tool directly
+        # No need for the tool wrapper since the arguments come from config
+        result = _fetch_emails_impl(
+            email_id=config.EMAIL_ID,
+            app_password=config.APP_PASSWORD,
+            start_date=start,
+            end_date=end,
         )
 
         # Extract email list from result
@@ -67,7 +68,7 @@ def run_email_workflow(start_date=None, end_date=None):
 
         print(f"✓ Fetched {len(email_list)} emails")
 
-        # email_list is already a list of dictionaries from the tool
+        # email_list is already a list of dictionaries from _fetch_emails_impl
         email_dicts = email_list
 
         # Save emails to JSON file for reference
@@ -94,13 +95,13 @@ def run_email_workflow(start_date=None, end_date=None):
 
         print(f"✓ Saved {len(email_dicts)} emails to {filepath}")
 
-        print("\nStep 2: Building ChromaDB vector store...")
+        print("\nStep 2: Building vector store...")
 
         # Build the vector store from the emails
         vectorstore = build_vector_store(email_dicts)
 
         print(f"✓ Vector store created successfully")
-        print(f"✓ Total documents in vector store: {vectorstore._collection.count()}")
+        print(f"✓ Total documents in vector store: {get_document_count(vectorstore)}")
 
         return vectorstore
 
@@ -2,6 +2,7 @@
 
 
 import os
+from dataclasses import dataclass, field
 
 from dotenv import load_dotenv
 
@@ -9,75 +10,96 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 
+def _env(name, default="", cast=str):
+    """Field whose value is read from the environment when Config is created."""
+    return field(default_factory=lambda: cast(os.getenv(name, default)))
+
+
+@dataclass(frozen=True, slots=True)
 class Config:
     """Application configuration loaded from environment variables."""
 
     # Email Configuration
-    EMAIL_ID = os.getenv("EMAIL_ID", "")
-    APP_PASSWORD = os.getenv("APP_PASSWORD", "")
+    EMAIL_ID: str = _env("EMAIL_ID")
+    APP_PASSWORD: str = _env("APP_PASSWORD")
 
     # Date Range for Email Fetching (required, no defaults)
-    START_DATE = os.getenv("START_DATE", "")
-    END_DATE = os.getenv("END_DATE", "")
+    START_DATE: str = _env("START_DATE")
+    END_DATE: str = _env("END_DATE")
 
     # LLM Provider Configuration
-    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "").lower()
+    LLM_PROVIDER: str = _env("LLM_PROVIDER", cast=str.lower)
 
     # Ollama Configuration
-    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-    OLLAMA_LLM_MODEL = os.getenv("OLLAMA_LLM_MODEL", "llama3.1:8b")
-    OLLAMA_EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL", "llama3.1:8b")
+    OLLAMA_BASE_URL: str = _env("OLLAMA_BASE_URL", "http://localhost:11434")
+    OLLAMA_LLM_MODEL: str = _env("OLLAMA_LLM_MODEL", "llama3.1:8b")
+    OLLAMA_EMBEDDING_MODEL: str = _env("OLLAMA_EMBEDDING_MODEL", "llama3.1:8b")
 
     # Gemini Configuration
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
+    GOOGLE_API_KEY: str = _env("GOOGLE_API_KEY")
 
     # Vector Store Configuration
-    CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "chroma_store")
-    CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "emails")
+    VECTOR_STORE_BACKEND: str = _env("VECTOR_STORE_BACKEND", "chroma", cast=str.lower)
+    CHROMA_PERSIST_DIRECTORY: str = _env("CHROMA_PERSIST_DIRECTORY", "chroma_store")
+    CHROMA_COLLECTION_NAME: str = _env("CHROMA_COLLECTION_NAME", "emails")
+    FAISS_PERSIST_DIRECTORY: str = _env("FAISS_PERSIST_DIRECTORY", "faiss_store")
 
     # LLM Configuration
-    LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.2"))
+    LLM_TEMPERATURE: float = _env("LLM_TEMPERATURE", "0.2", cast=float)
 
     # Query Configuration
-    DEFAULT_RETRIEVAL_COUNT = int(os.getenv("DEFAULT_RETRIEVAL_COUNT", "50"))
+    DEFAULT_RETRIEVAL_COUNT: int = _env("DEFAULT_RETRIEVAL_COUNT", "50", cast=int)
+
+    @property
+    def VECTOR_STORE_DIRECTORY(self):
+        """Persist directory of the configured vector store backend."""
+        if self.VECTOR_STORE_BACKEND == "faiss":
+            return self.FAISS_PERSIST_DIRECTORY
+        return self.CHROMA_PERSIST_DIRECTORY
 
-    @classmethod
-    def validate(cls):
+    def validate(self):
         """Validate that required configuration is present."""
         errors = []
 
         # Required email configuration
-        if not cls.EMAIL_ID:
+        if not self.EMAIL_ID:
             errors.append("EMAIL_ID is required")
-        if not cls.APP_PASSWORD:
+        if not self.APP_PASSWORD:
             errors.append("APP_PASSWORD is required")
 
         # Required date range
-        if not cls.START_DATE:
+        if not self.START_DATE:
             errors.append("START_DATE is required (format: YYYY-MM-DD)")
-        if not cls.END_DATE:
+        if not self.END_DATE:
             errors.append("END_DATE is required (format: YYYY-MM-DD)")
 
         # Required LLM provider
-        if not cls.LLM_PROVIDER:
+        if not self.LLM_PROVIDER:
             errors.append("LLM_PROVIDER is required (must be 'ollama' or 'gemini')")
-        elif cls.LLM_PROVIDER not in ["ollama", "gemini"]:
+        elif self.LLM_PROVIDER not in ["ollama", "gemini"]:
+            errors.append(
+                f"LLM_PROVIDER must be 'ollama' or 'gemini', got '{self.LLM_PROVIDER}'"
+            )
+
+        # Vector store backend
+        if self.VECTOR_STORE_BACKEND not in ["chroma", "faiss"]:
             errors.append(
-                f"LLM_PROVIDER must be 'ollama' or 'gemini', got '{cls.LLM_PROVIDER}'"
+                "VECTOR_STORE_BACKEND must be 'chroma' or 'faiss', "
+                f"got '{self.VECTOR_STORE_BACKEND}'"
             )
 
         # Provider-specific validation
-        if cls.LLM_PROVIDER == "ollama":
-            if not cls.OLLAMA_BASE_URL:
+        if self.LLM_PROVIDER == "ollama":
+            if not self.OLLAMA_BASE_URL:
                 errors.append("OLLAMA_BASE_URL is required when LLM_PROVIDER=ollama")
-            if not cls.OLLAMA_LLM_MODEL:
+            if not self.OLLAMA_LLM_MODEL:
                 errors.append("OLLAMA_LLM_MODEL is required when LLM_PROVIDER=ollama")
-            if not cls.OLLAMA_EMBEDDING_MODEL:
+            if not self.OLLAMA_EMBEDDING_MODEL:
                 errors.append(
                     "OLLAMA_EMBEDDING_MODEL is required when LLM_PROVIDER=ollama"
                 )
-        elif cls.LLM_PROVIDER == "gemini":
-            if not cls.GOOGLE_API_KEY:
+        elif self.LLM_PROVIDER == "gemini":
+            if not self.GOOGLE_API_KEY:
                 errors.append("GOOGLE_API_KEY is required when LLM_PROVIDER=gemini")
 
         if errors:
@@ -86,7 +108,7 @@ class Config:
                 + "\n".join(f"  - {e}" for e in errors)
             )
 
-        return True
+        return self
 
 
 # Create a singleton config instance
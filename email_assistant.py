@@ -11,7 +11,12 @@ import os
 import sys
 from datetime import datetime
 
-from agent_email_query import SimpleConversationMemory, load_vector_store, query_emails
+from agent_email_query import (
+    SimpleConversationMemory,
+    get_document_count,
+    load_vector_store,
+    query_emails,
+)
 from agent_email_workflow import run_email_workflow
 from config import config
 
@@ -25,8 +30,8 @@ def print_banner():
 
 def check_vector_store_exists():
     """Check if vector store exists."""
-    return os.path.exists(config.CHROMA_PERSIST_DIRECTORY) and os.path.isdir(
-        config.CHROMA_PERSIST_DIRECTORY
+    return os.path.exists(config.VECTOR_STORE_DIRECTORY) and os.path.isdir(
+        config.VECTOR_STORE_DIRECTORY
     )
 
 
@@ -34,7 +39,7 @@ def get_vector_store_info():
     """Get information about the existing vector store."""
     try:
         vectorstore = load_vector_store()
-        count = vectorstore._collection.count()
+        count = get_document_count(vectorstore)
         return count
     except Exception as e:
         return None
@@ -62,7 +67,7 @@ def cmd_status():
         count = get_vector_store_info()
         if count is not None:
             print(f"✓ Vector Store: Ready")
-            print(f"  - Location: {config.CHROMA_PERSIST_DIRECTORY}")
+            print(f"  - Location: {config.VECTOR_STORE_DIRECTORY}")
             print(f"  - Total Emails: {count}")
         else:
             print(f"✗ Vector Store: Error loading")
@@ -87,7 +92,7 @@ def cmd_refresh(start_date=None, end_date=None):
         if vectorstore:
             print("\n" + "=" * 60)
             print("✓ Email refresh completed successfully!")
-            print(f"✓ Total emails indexed: {vectorstore._collection.count()}")
+            print(f"✓ Total emails indexed: {get_document_count(vectorstore)}")
             print("=" * 60 + "\n")
             print("You can now query your emails using:")
             print("  python email_assistant.py query")
@@ -121,7 +126,7 @@ def cmd_query(interactive=True, question=None):
         # Load the vector store
         print("Loading vector store...")
         vectorstore = load_vector_store()
-        count = vectorstore._collection.count()
+        count = get_document_count(vectorstore)
         print(f"✓ Loaded {count} emails\n")
 
         if not interactive and question:
@@ -208,7 +213,7 @@ def cmd_workflow():
         print("=" * 60 + "\n")
 
         # Step 2: Query mode
-        count = vectorstore._collection.count()
+        count = get_document_count(vectorstore)
         print(f"✓ Ready to query {count} emails\n")
 
         # Initialize memory for this session
@@ -0,0 +1,61 @@
+"""HTML cleanup shared by email fetching and vector store indexing."""
+
+import re
+
+from selectolax.lexbor import LexborHTMLParser
+
+try:
+    import re2
+except ImportError:  # google-re2 is optional; fall back to the stdlib engine
+    re2 = None
+
+
+def _compile(pattern, flags=0):
+    """Compile pattern with RE2 when available, falling back to re."""
+    if re2 is not None:
+        options = re2.Options()
+        options.dot_nl = bool(flags & re.DOTALL)
+        options.case_sensitive = not flags & re.IGNORECASE
+        try:
+            return re2.compile(pattern, options)
+        except re2.error:
+            pass
+    return re.compile(pattern, flags)
+
+
+# CSS comments, at-rules (@media, @font-face, etc.), properties and brace blocks
+# removed in a single pass. Properties are only removed if they look like CSS
+# (property:value; or property: value;) so URLs and normal text survive. Runs
+# on RE2 when installed, which matches in linear time on large bodies.
+_RE_CSS = _compile(
+    r"(?P<comment>/\*.*?\*/)"
+    r"|(?P<at_rule>@[a-zA-Z-]+\s+[^{]*\{[^}]*\})"
+    r"|(?P<property>\b[a-zA-Z-]+\s*:\s*[^;{}\n]+;)"
+    r"|(?P<block>\{[^{}]*\})",
+    re.DOTALL,
+)
+
+
+def strip_html(text):
+    """
+    Convert an HTML email body to plain text.
+
+    Extracts the visible text (dropping style/script blocks, comments and tags,
+    and decoding entities), then removes any CSS that survived as text. Each
+    step is skipped when the text holds nothing for it to remove.
+
+    Args:
+        text: HTML (or partly HTML) body
+
+    Returns:
+        Plain text body; line breaks inside text nodes are preserved
+    """
+    if "<" in text or "&" in text:
+        tree = LexborHTMLParser(text)
+        tree.strip_tags(["style", "script"])
+        text = tree.text(separator=" ", strip=True)
+
+    if "{" in text or "/*" in text:
+        text = _RE_CSS.sub("", text)
+
+    return text